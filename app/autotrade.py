@@ -1,19 +1,30 @@
+import asyncio
+import atexit
 import base64
+import functools
+import hashlib
 import io
-import json
 import os
+import re
 import sqlite3  # SQLite 추가
+import threading
 import time
-from datetime import datetime
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from typing import Any, cast
 
+import aiohttp
+import fastjsonschema
+import numpy as np
+import orjson
 import pyupbit
 import requests
-import schedule
-import ta
+import talib
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 from PIL import Image
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.chrome.options import Options
@@ -23,8 +34,9 @@ from selenium.webdriver.support import expected_conditions
 from selenium.webdriver.support.ui import WebDriverWait
 
 
+@functools.lru_cache(maxsize=1)
 def is_ec2():
-    """EC2 환경인지 확인"""
+    """EC2 환경인지 확인 (프로세스 수명 동안 변하지 않으므로 결과를 캐시)"""
     try:
         return os.path.exists("/sys/hypervisor/uuid")
     except Exception as e:
@@ -79,10 +91,170 @@ def create_driver():
         raise
 
 
+# AI 매매 결정 응답 스키마 (OpenAI Structured Outputs와 응답 검증에 함께 사용)
+TRADING_DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "percentage": {
+            "type": "integer",
+            "description": "For buy: Percentage of available KRW to use for purchase. For sell: Percentage of held BTC to sell. For hold: Should be 0. Range: 0-100",
+        },
+        "confidence_score": {
+            "type": "integer",
+            "description": "Confidence level of the trading decision (0-100)",
+        },
+        "decision": {
+            "type": "string",
+            "description": "Trading decision to make",
+            "enum": ["buy", "sell", "hold"],
+        },
+        "reason": {
+            "type": "string",
+            "description": "Detailed explanation for the decision",
+        },
+        "reflection_based_adjustments": {
+            "type": "object",
+            "properties": {
+                "risk_adjustment": {"type": "string"},
+                "strategy_improvement": {"type": "string"},
+                "confidence_factors": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                },
+            },
+            "required": [
+                "risk_adjustment",
+                "strategy_improvement",
+                "confidence_factors",
+            ],
+            "additionalProperties": False,
+        },
+    },
+    "required": [
+        "percentage",
+        "confidence_score",
+        "decision",
+        "reason",
+        "reflection_based_adjustments",
+    ],
+    "additionalProperties": False,
+}
+
+
+# 주문 전에 확인하는 매매 결정 필드 범위 (OpenAI strict 스키마에는 범위 조건을 넣지 않음)
+DECISION_RANGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "percentage": {"type": "integer", "minimum": 0, "maximum": 100},
+        "confidence_score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "decision": {"enum": ["buy", "sell", "hold"]},
+    },
+    "required": ["percentage", "confidence_score", "decision"],
+}
+
+
+def _dumps(value, indent=False):
+    """orjson으로 JSON 문자열 직렬화 (numpy 값 지원, 그 외 타입은 str로 변환)"""
+    option = orjson.OPT_SERIALIZE_NUMPY
+    if indent:
+        option |= orjson.OPT_INDENT_2
+    return orjson.dumps(value, default=str, option=option).decode()
+
+
+def _round_floats(value: Any, digits: int = 2) -> Any:
+    """중첩된 dict/list 안의 실수를 반올림 (1보다 작은 값은 유효숫자 4자리 유지)"""
+    if isinstance(value, dict):
+        return {key: _round_floats(item, digits) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_round_floats(item, digits) for item in value]
+    if isinstance(value, float):
+        return round(value, digits) if abs(value) >= 1 else float(f"{value:.4g}")
+    return value
+
+
 # DatabaseManager 클래스 수정
 class DatabaseManager:
+    BATCH_SIZE = 100  # 버퍼에 이 개수 이상 쌓이면 한 트랜잭션으로 기록
+
+    # SQLite는 SQL 문자열 단위로 준비된 구문을 캐시하므로 동일한 문자열을 재사용
+    # reason 원문은 reasons 테이블에 한 번만 저장하고 거래에는 reason_id만 기록
+    INSERT_TRADE_SQL = """
+        INSERT INTO trading_history (
+            timestamp, decision, percentage, reason, reason_id,
+            btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price
+        ) VALUES (?, ?, ?, '', ?, ?, ?, ?, ?)
+    """
+    INSERT_REASON_SQL = "INSERT OR IGNORE INTO reasons (text) VALUES (?)"
+    SELECT_REASON_ID_SQL = "SELECT id FROM reasons WHERE text = ?"
+    INSERT_REFLECTION_SQL = """
+        INSERT INTO trading_reflection (
+            trading_id, reflection_date, market_condition,
+            decision_analysis, improvement_points, success_rate,
+            learning_points
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+    # 반성 분석에 필요한 컬럼만 조회 (reason은 reasons 테이블에서 한 번만 저장된 본문을 가져옴)
+    SELECT_RECENT_TRADES_SQL = """
+        SELECT
+            h.id, h.timestamp, h.decision, h.percentage,
+            COALESCE(r.text, h.reason) AS reason,
+            h.btc_balance, h.krw_balance, h.btc_avg_buy_price, h.btc_krw_price
+        FROM trading_history h
+        LEFT JOIN reasons r ON h.reason_id = r.id
+        ORDER BY h.timestamp DESC
+        LIMIT ?
+    """
+    SELECT_REFLECTION_HISTORY_SQL = """
+        SELECT
+            r.trading_id, r.reflection_date, r.market_condition,
+            r.decision_analysis, r.improvement_points, r.success_rate,
+            r.learning_points, h.decision, h.percentage, h.btc_krw_price
+        FROM trading_reflection r
+        JOIN trading_history h ON r.trading_id = h.id
+        ORDER BY r.reflection_date DESC
+        LIMIT ?
+    """
+    # 해당 날짜의 거래로 일별 집계를 다시 계산 (하루 거래는 몇 건뿐이라 비용이 작음)
+    UPSERT_DAILY_ROLLUP_SQL = """
+        INSERT OR REPLACE INTO trading_daily_rollup (
+            date, n_buy, n_sell, n_hold,
+            avg_pct_buy, avg_pct_sell, avg_pct_hold
+        )
+        SELECT
+            d.date,
+            SUM(h.decision = 'buy'), SUM(h.decision = 'sell'), SUM(h.decision = 'hold'),
+            AVG(CASE WHEN h.decision = 'buy' THEN h.percentage END),
+            AVG(CASE WHEN h.decision = 'sell' THEN h.percentage END),
+            AVG(CASE WHEN h.decision = 'hold' THEN h.percentage END)
+        FROM (SELECT ? AS date) d
+        JOIN trading_history h
+            ON h.timestamp >= d.date AND h.timestamp < date(d.date, '+1 day')
+        GROUP BY d.date
+    """
+    SELECT_AI_CACHE_SQL = """
+        SELECT created_at, ttl_sec, response_json FROM ai_cache
+        WHERE key = ?
+    """
+    UPSERT_AI_CACHE_SQL = """
+        INSERT OR REPLACE INTO ai_cache (key, created_at, response_json, ttl_sec)
+        VALUES (?, ?, ?, ?)
+    """
+
     def __init__(self, db_path="trading.db"):
-        self.conn = sqlite3.connect(db_path)
+        # 여러 스레드에서 하나의 연결을 공유하고, 접근은 self._lock으로 직렬화
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row  # 컬럼 이름으로 접근
+        self._lock = threading.RLock()
+        # 매 커밋마다 fsync가 발생하지 않도록 WAL 모드 사용
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-64000")  # 64MB 페이지 캐시
+        self.conn.execute("PRAGMA mmap_size=268435456")  # 256MB 메모리 맵
+        self._trade_buffer = []
+        self._reflection_buffer = []
+        self._ai_cache_buffer = []
+        self._ai_cache_memo = {}  # key -> (만료 시각, 응답): 같은 프로세스 안에서는 DB 조회도 생략
         self.setup_database()
 
     def setup_database(self):
@@ -94,12 +266,37 @@ class DatabaseManager:
                 timestamp DATETIME NOT NULL,
                 decision TEXT NOT NULL,
                 percentage REAL NOT NULL,
-                reason TEXT NOT NULL,
+                reason TEXT NOT NULL DEFAULT '',
                 btc_balance REAL NOT NULL,
                 krw_balance REAL NOT NULL,
                 btc_avg_buy_price REAL NOT NULL,
-                btc_krw_price REAL NOT NULL
+                btc_krw_price REAL NOT NULL,
+                reason_id INTEGER REFERENCES reasons(id)
+            )
+        """)
+
+        # 거래 사유 원문 테이블 (같은 사유는 한 번만 저장)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reasons (
+                id INTEGER PRIMARY KEY,
+                text TEXT NOT NULL UNIQUE
+            )
+        """)
+        # 이전 스키마의 DB는 reason_id 컬럼을 추가하고 기존 사유를 reasons로 옮김
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(trading_history)")]
+        if "reason_id" not in columns:
+            cursor.execute(
+                "ALTER TABLE trading_history ADD COLUMN reason_id INTEGER REFERENCES reasons(id)"
             )
+        cursor.execute("""
+            INSERT OR IGNORE INTO reasons (text)
+            SELECT DISTINCT reason FROM trading_history WHERE reason_id IS NULL
+        """)
+        cursor.execute("""
+            UPDATE trading_history
+            SET reason_id = (SELECT id FROM reasons WHERE text = trading_history.reason),
+                reason = ''
+            WHERE reason_id IS NULL
         """)
 
         # 거래 반성 일기 테이블 추가
@@ -116,91 +313,209 @@ class DatabaseManager:
                 FOREIGN KEY (trading_id) REFERENCES trading_history(id)
             )
         """)
+
+        # 조회 패턴(최신순 정렬 + LIMIT, 반성 일기-거래 JOIN)에 맞춘 인덱스
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_trading_history_ts
+            ON trading_history(timestamp DESC)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_refl_trading_id
+            ON trading_reflection(trading_id)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_refl_date
+            ON trading_reflection(reflection_date DESC)
+        """)
+
+        # 대시보드용 일별 거래 집계
+        # (잔고 컬럼이 있던 이전 스키마는 파생 데이터이므로 지우고 아래에서 다시 채움)
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(trading_daily_rollup)")]
+        if "last_btc_balance" in columns:
+            cursor.execute("DROP TABLE trading_daily_rollup")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS trading_daily_rollup (
+                date TEXT PRIMARY KEY,
+                n_buy INTEGER NOT NULL,
+                n_sell INTEGER NOT NULL,
+                n_hold INTEGER NOT NULL,
+                avg_pct_buy REAL,
+                avg_pct_sell REAL,
+                avg_pct_hold REAL
+            )
+        """)
+        # 집계 테이블이 새로 생긴 경우 기존 거래 내역으로 채움
+        if cursor.execute("SELECT 1 FROM trading_daily_rollup LIMIT 1").fetchone() is None:
+            dates = cursor.execute(
+                "SELECT DISTINCT date(timestamp) FROM trading_history"
+            ).fetchall()
+            self._update_daily_rollup(cursor, [row[0] for row in dates])
+
+        # 시장 스냅샷 지문별 AI 응답 캐시
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ai_cache (
+                key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                response_json TEXT NOT NULL,
+                ttl_sec INTEGER NOT NULL DEFAULT 3600
+            )
+        """)
         self.conn.commit()
 
+    def _update_daily_rollup(self, cursor, dates):
+        """주어진 날짜(YYYY-MM-DD)들의 일별 집계를 갱신"""
+        cursor.executemany(self.UPSERT_DAILY_ROLLUP_SQL, [(day,) for day in set(dates)])
+
     def get_recent_trades(self, limit=10):
         """최근 거래 내역 조회"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            SELECT * FROM trading_history
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """,
-            (limit,),
-        )
-        return cursor.fetchall()
+        with self._lock:
+            self.flush()  # 버퍼에 남은 거래도 조회되도록 먼저 기록
+            return self.conn.execute(self.SELECT_RECENT_TRADES_SQL, (limit,)).fetchall()
 
     def get_reflection_history(self, limit=10):
         """최근 반성 일기 조회"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            SELECT r.*, h.decision, h.percentage, h.btc_krw_price
-            FROM trading_reflection r
-            JOIN trading_history h ON r.trading_id = h.id
-            ORDER BY r.reflection_date DESC
-            LIMIT ?
-        """,
-            (limit,),
-        )
-        return cursor.fetchall()
+        with self._lock:
+            self.flush()
+            return self.conn.execute(self.SELECT_REFLECTION_HISTORY_SQL, (limit,)).fetchall()
 
     def add_reflection(self, reflection_data):
-        """반성 일기 추가"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO trading_reflection (
-                trading_id, reflection_date, market_condition,
-                decision_analysis, improvement_points, success_rate,
-                learning_points
-            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                reflection_data["trading_id"],
-                reflection_data["reflection_date"],
-                reflection_data["market_condition"],
-                reflection_data["decision_analysis"],
-                reflection_data["improvement_points"],
-                reflection_data["success_rate"],
-                reflection_data["learning_points"],
-            ),
+        """반성 일기 추가 (버퍼에 쌓았다가 일괄 기록)"""
+        row = (
+            reflection_data["trading_id"],
+            reflection_data["reflection_date"],
+            reflection_data["market_condition"],
+            reflection_data["decision_analysis"],
+            reflection_data["improvement_points"],
+            reflection_data["success_rate"],
+            reflection_data["learning_points"],
+        )
+        with self._lock:
+            self._reflection_buffer.append(row)
+            if len(self._reflection_buffer) >= self.BATCH_SIZE:
+                self.flush()
+
+    @staticmethod
+    def _trade_row(trade_data):
+        """거래 데이터를 튜플로 변환 (reason 원문은 기록 시 _intern_reason으로 ID로 바꿈)"""
+        return (
+            datetime.now(),
+            trade_data["decision"],
+            trade_data["percentage"],
+            trade_data["reason"],
+            trade_data["btc_balance"],
+            trade_data["krw_balance"],
+            trade_data["btc_avg_buy_price"],
+            trade_data["btc_krw_price"],
         )
-        self.conn.commit()
 
-    def record_trade(self, trade_data):
-        """거래 데이터를 데이터베이스에 기록"""
-        cursor = self.conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO trading_history (
-                timestamp, decision, percentage, reason,
-                btc_balance, krw_balance, btc_avg_buy_price, btc_krw_price
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-            (
-                datetime.now(),
-                trade_data["decision"],
-                trade_data["percentage"],
-                trade_data["reason"],
-                trade_data["btc_balance"],
-                trade_data["krw_balance"],
-                trade_data["btc_avg_buy_price"],
-                trade_data["btc_krw_price"],
-            ),
+    def _intern_reason(self, cursor, text):
+        """reason 원문을 reasons 테이블에 한 번만 저장하고 ID 반환"""
+        cursor.execute(self.INSERT_REASON_SQL, (text,))
+        return cursor.execute(self.SELECT_REASON_ID_SQL, (text,)).fetchone()[0]
+
+    def _insert_trades(self, cursor, rows):
+        """reason을 ID로 바꿔 거래를 기록하고 해당 날짜의 일별 집계 갱신 (마지막 거래 ID 반환)"""
+        cursor.executemany(
+            self.INSERT_TRADE_SQL,
+            [(*row[:3], self._intern_reason(cursor, row[3]), *row[4:]) for row in rows],
         )
-        self.conn.commit()
-        return cursor.lastrowid  # 새로 삽입된 레코드의 ID 반환
+        # executemany는 lastrowid를 설정하지 않으므로 집계 갱신 전에 직접 조회
+        last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+        self._update_daily_rollup(cursor, [row[0].date().isoformat() for row in rows])
+        return last_id
+
+    def record_trade(self, trade_data, need_id=False):
+        """거래 데이터를 데이터베이스에 기록
+
+        need_id=True 이면 즉시 INSERT 후 새 레코드의 ID를 반환하고,
+        그 외에는 버퍼에 쌓았다가 일괄 기록하며 None을 반환한다.
+        """
+        if not need_id:
+            self.record_trades([trade_data])
+            return None
+
+        with self._lock:
+            self.flush()
+            with self.conn:
+                # 새로 삽입된 레코드의 ID 반환
+                return self._insert_trades(self.conn.cursor(), [self._trade_row(trade_data)])
+
+    def record_trades(self, trades):
+        """여러 거래 데이터를 버퍼에 쌓았다가 다음 flush 때 한 트랜잭션으로 기록"""
+        rows = [self._trade_row(trade_data) for trade_data in trades]
+        with self._lock:
+            self._trade_buffer.extend(rows)
+            if len(self._trade_buffer) >= self.BATCH_SIZE:
+                self.flush()
+
+    def get_ai_cache(self, key):
+        """유효 기간이 남은 캐시된 AI 응답 조회 (없으면 None)"""
+        now = time.time()
+        with self._lock:
+            memo = self._ai_cache_memo.get(key)
+            if memo is not None and memo[0] > now:
+                return memo[1]
+
+            row = self.conn.execute(self.SELECT_AI_CACHE_SQL, (key,)).fetchone()
+            if row is None or row["created_at"] + row["ttl_sec"] <= now:
+                return None
+            response = orjson.loads(row["response_json"])
+            self._ai_cache_memo[key] = (row["created_at"] + row["ttl_sec"], response)
+            return response
+
+    def set_ai_cache(self, key, response, ttl_sec=3600):
+        """AI 응답을 캐시에 저장 (메모리에는 즉시, DB에는 다음 flush 때 기록)"""
+        now = time.time()
+        with self._lock:
+            self._ai_cache_buffer.append((key, now, _dumps(response), ttl_sec))
+            self._ai_cache_memo[key] = (now + ttl_sec, response)
+
+    def flush(self):
+        """버퍼에 쌓인 거래/반성 일기/AI 응답 캐시를 하나의 트랜잭션으로 기록"""
+        with self._lock:
+            if not (self._trade_buffer or self._reflection_buffer or self._ai_cache_buffer):
+                return
+            with self.conn:
+                cursor = self.conn.cursor()
+                if self._trade_buffer:
+                    self._insert_trades(cursor, self._trade_buffer)
+                if self._reflection_buffer:
+                    cursor.executemany(self.INSERT_REFLECTION_SQL, self._reflection_buffer)
+                if self._ai_cache_buffer:
+                    cursor.executemany(self.UPSERT_AI_CACHE_SQL, self._ai_cache_buffer)
+            self._trade_buffer.clear()
+            self._reflection_buffer.clear()
+            self._ai_cache_buffer.clear()
+
+    def close(self):
+        """남은 버퍼를 기록하고 연결 종료"""
+        with self._lock:
+            self.flush()
+            self.conn.close()
+
+
+@dataclass(slots=True, frozen=True)
+class Balances:
+    """계좌 잔고 스냅샷"""
+
+    krw: float
+    crypto: float
+    avg_buy_price: float
 
 
 class TradeManager:
     """거래 실행을 담당하는 클래스"""
 
-    def __init__(self, upbit_client, ticker="KRW-BTC"):
+    def __init__(self, upbit_client, ticker="KRW-BTC", price_provider=None):
         self.upbit = upbit_client
         self.ticker = ticker
         self.MIN_TRADE_AMOUNT = 5000
+        # 현재가 조회 함수 (지정하지 않으면 매번 pyupbit로 조회)
+        self._price_provider = price_provider or self._fetch_price
+
+    def _fetch_price(self):
+        """현재가 조회"""
+        return pyupbit.get_current_price(self.ticker)
 
     def execute_market_buy(self, amount):
         """시장가 매수 주문 실행"""
@@ -210,7 +525,7 @@ class TradeManager:
 
     def execute_market_sell(self, amount):
         """시장가 매도 주문 실행"""
-        price = pyupbit.get_current_price(self.ticker)
+        price = self._price_provider()
         if price is None:
             return None
         # 타입 체커를 위해 명시적 캐스팅
@@ -236,14 +551,34 @@ class TradeManager:
 
         return trade_ratio
 
+    def get_account_balances(self):
+        """전체 계좌를 한 번에 조회해 원화/코인 잔고와 평균 매수가 반환"""
+        fiat, currency = self.ticker.split("-")
+        balances = self.upbit.get_balances()
+        if not isinstance(balances, list):
+            raise ValueError(f"계좌 조회 실패: {balances}")
+
+        krw_balance = 0.0
+        crypto_balance = 0.0
+        avg_buy_price = 0.0
+        for item in balances:
+            if item["currency"] == fiat:
+                krw_balance = float(item["balance"])
+            elif item["currency"] == currency and item["unit_currency"] == fiat:
+                crypto_balance = float(item["balance"])
+                avg_buy_price = float(item["avg_buy_price"])
+
+        return Balances(krw=krw_balance, crypto=crypto_balance, avg_buy_price=avg_buy_price)
+
     def get_current_balances(self):
         """현재 잔고 상태 조회"""
-        price = pyupbit.get_current_price(self.ticker)
+        price = self._price_provider()
         btc_krw_price = float(cast(float | str, price)) if price is not None else 0.0
+        balances = self.get_account_balances()
         return {
-            "btc_balance": float(self.upbit.get_balance(self.ticker)),
-            "krw_balance": float(self.upbit.get_balance("KRW")),
-            "btc_avg_buy_price": float(self.upbit.get_avg_buy_price(self.ticker)),
+            "btc_balance": balances.crypto,
+            "krw_balance": balances.krw,
+            "btc_avg_buy_price": balances.avg_buy_price,
             "btc_krw_price": btc_krw_price,
         }
 
@@ -251,109 +586,282 @@ class TradeManager:
 load_dotenv()
 
 
-def capture_full_page(url, output_path):
-    """웹페이지 캡처 함수"""
-    driver = None
-    try:
-        driver = create_driver()
-        wait = WebDriverWait(driver, 20)
-
-        driver.get(url)
-        time.sleep(5)  # 초기 로딩 대기
-
-        try:
-            # 시간 설정 버튼 클릭
-            time_button = wait.until(
-                expected_conditions.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "/html/body/div[1]/div[2]/div[3]/div/section[1]/article[1]/div/span[2]/div/div/div[1]/div[1]/div/cq-menu[1]/span/cq-clickable",
-                    )
-                )
-            )
-            time_button.click()
-            time.sleep(1)
-
-            # 1시간 옵션 클릭
-            hour_option = wait.until(
-                expected_conditions.element_to_be_clickable(
-                    (
-                        By.XPATH,
-                        "/html/body/div[1]/div[2]/div[3]/div/section[1]/article[1]/div/span[2]/div/div/div[1]/div[1]/div/cq-menu[1]/cq-menu-dropdown/cq-item[8]",
-                    )
-                )
-            )
-            hour_option.click()
-            time.sleep(3)
-        except TimeoutException:
-            print("차트 시간 설정을 찾을 수 없습니다. 기본 설정으로 진행합니다.")
-
-        # 전체 페이지 높이 구하기
-        total_height = driver.execute_script("return document.body.scrollHeight")
-        driver.set_window_size(1920, total_height)
-
-        # 스크린샷 캡처
-        png = driver.get_screenshot_as_png()
-
-        # PIL Image로 변환 및 최적화
-        img = Image.open(io.BytesIO(png))
-        img.thumbnail((2000, 2000))
-        img.save(output_path, optimize=True, quality=85)
-        print(f"차트 이미지 저장 완료: {output_path}")
-        return True
-
-    except Exception as e:
-        print(f"페이지 캡처 중 오류 발생: {e}")
-        return False
-
-    finally:
-        if driver:
-            driver.quit()
-
-
 class EnhancedCryptoTrader:
+    MA_WINDOWS = (5, 20, 60, 120)  # 이동평균선 기간
+    DAILY_OUTPUT_ROWS = 7  # AI에 전달할 일봉 개수
+    HOURLY_OUTPUT_ROWS = 6  # AI에 전달할 시간봉 개수
+    HTTP_TIMEOUT = aiohttp.ClientTimeout(sock_connect=3, sock_read=10)  # 연결/읽기 타임아웃(초)
+    HTTP_RETRIES = 3  # 연결 오류 시 재시도 횟수
+    UPBIT_API_URL = "https://api.upbit.com/v1"
+    MARKET_TTL = 2.0  # 시세/호가 캐시 유지 시간(초)
+    UPBIT_TIMEOUT = (3, 10)  # (연결, 읽기) 타임아웃(초)
+
+    # 매매 결정 모델 라우팅 (단순한 장세는 작은 모델로 처리)
+    DECISION_MODEL = "gpt-4o-2024-08-06"
+    SIMPLE_DECISION_MODEL = "gpt-4o-mini"
+    SIMPLE_VOLATILITY_MAX = 0.005  # 시간봉 로그수익률 표준편차 상한
+    NEUTRAL_FEAR_GREED = (25, 75)  # 이 범위 안이면 심리 지표가 중립
+    # 델타 인코딩할 원화 가격 열
+    DELTA_COLUMNS = (
+        "open",
+        "high",
+        "low",
+        "close",
+        "bb_high",
+        "bb_mid",
+        "bb_low",
+        *(f"ma{window}" for window in MA_WINDOWS),
+    )
+    AI_CACHE_TTL = 3600  # 같은 시장 스냅샷에 대한 관망 응답 재사용 시간(초)
+
+    # 스트리밍 응답에서 매매 결정 필드를 먼저 추출하기 위한 패턴
+    # (strict json_schema는 schema에 선언된 순서대로 필드를 출력함)
+    EARLY_DECISION_RE = re.compile(
+        r'"percentage"\s*:\s*(\d+)\s*,\s*"confidence_score"\s*:\s*(\d+)\s*,'
+        r'\s*"decision"\s*:\s*"(buy|sell|hold)"'
+    )
+
+    # 차트 시간 설정 메뉴 (ChartIQ 컴포넌트 태그/클래스 기준 CSS 선택자)
+    PERIOD_MENU_CSS = "cq-menu.ciq-period"
+    PERIOD_BUTTON_CSS = f"{PERIOD_MENU_CSS} > span > cq-clickable"
+    PERIOD_DROPDOWN_CSS = f"{PERIOD_MENU_CSS} > cq-menu-dropdown"
+    PERIOD_HOUR_OPTION_CSS = f"{PERIOD_DROPDOWN_CSS} > cq-item:nth-of-type(8)"  # 1시간
+    CHART_REDRAW_TIMEOUT = 5  # 주기 변경 후 차트 갱신 대기 시간(초)
+
     def __init__(self, ticker="KRW-BTC"):
         self.ticker = ticker
         self.access = os.getenv("UPBIT_ACCESS_KEY")
         self.secret = os.getenv("UPBIT_SECRET_KEY")
         self.upbit = pyupbit.Upbit(self.access, self.secret)
 
+        # pyupbit는 호출마다 requests.get/post를 새로 열어 TCP/TLS 핸드셰이크를 반복하므로,
+        # 내부에서 참조하는 requests를 공유 세션으로 바꿔 keep-alive 커넥션을 재사용
+        self.upbit_http = requests.Session()
+        self.upbit_http.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        pyupbit.request_api.requests = self.upbit_http
+
+        # 한 사이클 안에서 반복되는 시세/호가 조회를 줄이기 위한 캐시
+        self._tick_lock = threading.Lock()
+        self._tick_cache = None
+        self._tick_time = 0.0
+
         # 하위 매니저 클래스들 초기화
-        self.trade_manager = TradeManager(self.upbit, ticker)
+        self.trade_manager = TradeManager(self.upbit, ticker, price_provider=self._price)
         self.db = DatabaseManager()
+        self._balances = None  # 사이클 시작 시 조회한 잔고 (주문 후에는 무효화)
 
         # 기타 설정
-        self.client = OpenAI()
+        self.client = AsyncOpenAI()
         self.serpapi_key = os.getenv("SERPAPI_KEY")
         self.fear_greed_api = "https://api.alternative.me/fng/"
         self.youtube_channels = ["3XbtEX3jUv4"]
 
-    def analyze_past_decisions(self):
-        """과거 거래 분석 및 반성"""
+        # true(기본값)이면 차트 이미지와 전략 자료를 매매 결정 요청 하나에 함께 보내고,
+        # false이면 차트/유튜브 분석을 별도로 호출 (디버깅용)
+        self.fused_analysis = os.getenv("FUSED_ANALYSIS", "true").lower() == "true"
+
+        # 전략 자료는 변하지 않으므로 한 번만 읽어 둠
+        try:
+            with open("strategy.txt", encoding="utf-8") as f:
+                self._strategy_text = f.read()
+        except OSError as e:
+            print(f"strategy.txt를 읽을 수 없습니다: {e}")
+            self._strategy_text = None
+
+        # 응답 검증 함수는 스키마를 한 번만 컴파일해 재사용
+        self._validate_decision = cast(
+            Callable[[Any], Any],
+            fastjsonschema.compile({"allOf": [TRADING_DECISION_SCHEMA, DECISION_RANGE_SCHEMA]}),
+        )
+        self._validate_early_decision = cast(
+            Callable[[Any], Any], fastjsonschema.compile(DECISION_RANGE_SCHEMA)
+        )
+
+        # 외부 API 호출용 HTTP 세션 (이벤트 루프 안에서 처음 사용할 때 생성)
+        self.http = None
+
+        # 차트 캡처용 WebDriver는 처음 사용할 때 생성해 계속 재사용
+        self._driver = None
+        atexit.register(self.close)
+
+    def _get_driver(self):
+        """재사용 중인 WebDriver 반환 (응답이 없으면 새로 생성)"""
+        if self._driver is not None:
+            try:
+                _ = self._driver.current_url
+                return self._driver
+            except Exception as e:
+                print(f"WebDriver 재생성 중: {e}")
+                self._quit_driver()
+
+        self._driver = create_driver()
+        return self._driver
+
+    def _quit_driver(self):
+        """WebDriver 종료"""
+        if self._driver is None:
+            return
+        try:
+            self._driver.quit()
+        except Exception as e:
+            print(f"WebDriver 종료 중 오류 발생: {e}")
+        finally:
+            self._driver = None
+
+    def _fetch_market_bundle(self):
+        """시세(/ticker)와 호가(/orderbook)를 함께 조회 (MARKET_TTL초 동안은 직전 값 재사용)"""
+        with self._tick_lock:
+            now = time.monotonic()
+            if self._tick_cache is not None and now - self._tick_time < self.MARKET_TTL:
+                return self._tick_cache
+
+            bundle = {}
+            for endpoint in ("ticker", "orderbook"):
+                response = self.upbit_http.get(
+                    f"{self.UPBIT_API_URL}/{endpoint}",
+                    params={"markets": self.ticker},
+                    timeout=self.UPBIT_TIMEOUT,
+                )
+                response.raise_for_status()
+                bundle[endpoint] = response.json()[0]
+
+            self._tick_cache = bundle
+            self._tick_time = now
+            return bundle
+
+    def _price(self):
+        """현재가 조회 (시세/호가 캐시 사용)"""
+        try:
+            return float(self._fetch_market_bundle()["ticker"]["trade_price"])
+        except Exception as e:
+            print(f"Error in _price: {e}")
+            return None
+
+    def _get_http(self):
+        """재사용 중인 HTTP 세션 반환 (커넥션 풀링 + keep-alive로 TLS 핸드셰이크 재사용)"""
+        if self.http is None or self.http.closed:
+            self.http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4), timeout=self.HTTP_TIMEOUT
+            )
+        return self.http
+
+    async def _get_json(self, url, params=None):
+        """GET 요청 후 JSON 반환 (연결 오류는 재시도, 200이 아니면 None)"""
+        # requests와 달리 aiohttp는 None 값 파라미터를 허용하지 않음
+        params = {k: v for k, v in (params or {}).items() if v is not None}
+        for attempt in range(self.HTTP_RETRIES + 1):
+            try:
+                async with self._get_http().get(url, params=params) as response:
+                    if response.status != 200:
+                        return None
+                    return await response.json(content_type=None)
+            except (TimeoutError, aiohttp.ClientConnectionError):
+                if attempt == self.HTTP_RETRIES:
+                    raise
+                await asyncio.sleep(0.3 * 2**attempt)
+
+    def close(self):
+        """WebDriver, Upbit HTTP 세션 종료 및 데이터베이스 연결 정리"""
+        self._quit_driver()
+        self.upbit_http.close()
+        self.db.close()
+
+    async def aclose(self):
+        """HTTP 세션을 닫은 뒤 나머지 리소스 정리"""
+        if self.http is not None and not self.http.closed:
+            await self.http.close()
+        self.close()
+
+    def capture_full_page(self, url):
+        """웹페이지 캡처 함수 (재사용 중인 드라이버 사용, 압축된 JPEG 바이트 반환)"""
+        try:
+            driver = self._get_driver()
+            wait = WebDriverWait(driver, 20)
+
+            driver.get(url)
+
+            dropdown_locator = (By.CSS_SELECTOR, self.PERIOD_DROPDOWN_CSS)
+            button_locator = (By.CSS_SELECTOR, self.PERIOD_BUTTON_CSS)
+            try:
+                # 초기 로딩: 차트 캔버스가 DOM에 나타날 때까지 대기
+                wait.until(
+                    expected_conditions.presence_of_element_located(
+                        (By.CSS_SELECTOR, "cq-context canvas")
+                    )
+                )
+
+                # 시간 설정 버튼 클릭
+                time_button = wait.until(
+                    expected_conditions.element_to_be_clickable(button_locator)
+                )
+                time_button.click()
+                wait.until(expected_conditions.visibility_of_element_located(dropdown_locator))
+
+                # 1시간 옵션 클릭
+                hour_option = wait.until(
+                    expected_conditions.element_to_be_clickable(
+                        (By.CSS_SELECTOR, self.PERIOD_HOUR_OPTION_CSS)
+                    )
+                )
+                # 선택 후 시간 설정 버튼에 표시될 주기 이름 (예: 1시간)
+                hour_label = hour_option.text.strip()
+                hour_option.click()
+            except TimeoutException:
+                print("차트 시간 설정을 찾을 수 없습니다. 기본 설정으로 진행합니다.")
+            else:
+                # 드롭다운이 닫히고 버튼의 주기 표시가 바뀔 때까지 대기
+                # (ChartIQ는 캔버스를 교체하지 않고 제자리에서 다시 그리므로 캔버스로는 판단 불가)
+                try:
+                    redraw_wait = WebDriverWait(driver, self.CHART_REDRAW_TIMEOUT)
+                    redraw_wait.until(
+                        expected_conditions.invisibility_of_element_located(dropdown_locator)
+                    )
+                    if hour_label:
+                        redraw_wait.until(
+                            expected_conditions.text_to_be_present_in_element(
+                                button_locator, hour_label
+                            )
+                        )
+                except TimeoutException:
+                    print("차트 갱신 대기 시간이 초과되었습니다. 현재 화면으로 진행합니다.")
+
+            # 전체 페이지 높이 구하기
+            total_height = driver.execute_script("return document.body.scrollHeight")
+            driver.set_window_size(1920, total_height)
+
+            # 스크린샷 캡처
+            png = driver.get_screenshot_as_png()
+
+            # PIL Image로 변환 및 최적화
+            img = Image.open(io.BytesIO(png))
+            # 차트 판독에는 1280px이면 충분하고, JPEG가 PNG보다 훨씬 작음
+            img.thumbnail((1280, 1280))
+            buffer = io.BytesIO()
+            img.convert("RGB").save(buffer, "JPEG", quality=75, optimize=True)
+            print("차트 이미지 캡처 완료")
+            return buffer.getvalue()
+
+        except Exception as e:
+            print(f"페이지 캡처 중 오류 발생: {e}")
+            return None
+
+    async def analyze_past_decisions(self, current_market):
+        """과거 거래 분석 및 반성 (current_market: 이번 사이클에 이미 수집한 시장 데이터)"""
         print("analyze_past_decisions")
         try:
-            # 최근 거래 내역 조회
-            recent_trades = self.db.get_recent_trades(10)
-            recent_reflections = self.db.get_reflection_history(5)
-
-            # 현재 시장 상태 조회
-            price = pyupbit.get_current_price(self.ticker)
-            market_price = float(cast(float | str, price)) if price is not None else 0.0
-            current_market = {
-                "price": market_price,
-                "status": self.get_current_status(),
-                "fear_greed": self.get_fear_greed_index(),
-                "technical": self.get_ohlcv_data(),
-            }
+            recent_trades, recent_reflections = await asyncio.gather(
+                asyncio.to_thread(self.db.get_recent_trades, 10),
+                asyncio.to_thread(self.db.get_reflection_history, 5),
+            )
             print("1")
             # AI에 분석 요청
             reflection_prompt = {
-                "recent_trades": recent_trades,
-                "recent_reflections": recent_reflections,
+                "recent_trades": [dict(row) for row in recent_trades],
+                "recent_reflections": [dict(row) for row in recent_reflections],
                 "current_market": current_market,
             }
 
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-4-turbo-preview",
                 messages=[
                     {
@@ -369,7 +877,7 @@ class EnhancedCryptoTrader:
                     },
                     {
                         "role": "user",
-                        "content": f"Analyze these trading records and market conditions and provide response in JSON format:\n{json.dumps(reflection_prompt, indent=2)}",
+                        "content": f"Analyze these trading records and market conditions and provide response in JSON format:\n{_dumps(reflection_prompt)}",
                     },
                 ],
                 response_format={"type": "json_object"},
@@ -378,11 +886,11 @@ class EnhancedCryptoTrader:
             content = response.choices[0].message.content
             if content is None:
                 raise ValueError("Empty response from OpenAI")
-            reflection = json.loads(content)
+            reflection = orjson.loads(content)
 
             # 반성 일기 저장
             reflection_data = {
-                "trading_id": recent_trades[0][0],  # 최근 거래 ID
+                "trading_id": recent_trades[0]["id"],  # 최근 거래 ID
                 "reflection_date": datetime.now(),
                 "market_condition": reflection["market_condition"],
                 "decision_analysis": reflection["decision_analysis"],
@@ -393,11 +901,9 @@ class EnhancedCryptoTrader:
             print("3")
 
             print("\n=== Reflection Data ===")
-            print(
-                json.dumps(reflection_data, indent=2, default=str)
-            )  # datetime 객체를 위해 default=str 추가
+            print(_dumps(reflection_data, indent=True))
 
-            self.db.add_reflection(reflection_data)
+            await asyncio.to_thread(self.db.add_reflection, reflection_data)
 
             return reflection
 
@@ -405,13 +911,11 @@ class EnhancedCryptoTrader:
             print(f"Error in analyze_past_decisions: {e}")
             return None
 
-    def get_fear_greed_index(self, limit=7):
+    async def get_fear_greed_index(self, limit=7):
         """공포탐욕지수 데이터 조회"""
         try:
-            response = requests.get(f"{self.fear_greed_api}?limit={limit}")
-            if response.status_code == 200:
-                data = response.json()
-
+            data = await self._get_json(self.fear_greed_api, params={"limit": limit})
+            if data is not None:
                 latest = data["data"][0]
                 print("\n=== Fear and Greed Index ===")
                 print(f"Current Value: {latest['value']} ({latest['value_classification']})")
@@ -447,49 +951,53 @@ class EnhancedCryptoTrader:
             print(f"Error in get_fear_greed_index: {e}")
             return None
 
-    def add_technical_indicators(self, df):
-        """기술적 분석 지표 추가"""
+    def add_technical_indicators(self, df, output_rows=None):
+        """기술적 분석 지표 추가 (output_rows가 주어지면 마지막 n개 행만 반환)"""
+        # TA-Lib(C 구현)은 float64 numpy 배열을 직접 받아 계산 (열마다 한 번만 변환)
+        high = df["high"].to_numpy(dtype=np.float64)
+        low = df["low"].to_numpy(dtype=np.float64)
+        close = df["close"].to_numpy(dtype=np.float64)
+
         # 볼린저 밴드
-        indicator_bb = ta.volatility.BollingerBands(close=df["close"])  # type: ignore[attr-defined]
-        df["bb_high"] = indicator_bb.bollinger_hband()
-        df["bb_mid"] = indicator_bb.bollinger_mavg()
-        df["bb_low"] = indicator_bb.bollinger_lband()
-        df["bb_pband"] = indicator_bb.bollinger_pband()
+        bb_high, bb_mid, bb_low = talib.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2)
+        df["bb_high"] = bb_high
+        df["bb_mid"] = bb_mid
+        df["bb_low"] = bb_low
+        df["bb_pband"] = (close - bb_low) / (bb_high - bb_low)
 
         # RSI
-        df["rsi"] = ta.momentum.RSIIndicator(close=df["close"]).rsi()  # type: ignore[attr-defined]
+        df["rsi"] = talib.RSI(close, timeperiod=14)
 
         # MACD
-        macd = ta.trend.MACD(close=df["close"])  # type: ignore[attr-defined]
-        df["macd"] = macd.macd()
-        df["macd_signal"] = macd.macd_signal()
-        df["macd_diff"] = macd.macd_diff()
+        macd, macd_signal, macd_diff = talib.MACD(
+            close, fastperiod=12, slowperiod=26, signalperiod=9
+        )
+        df["macd"] = macd
+        df["macd_signal"] = macd_signal
+        df["macd_diff"] = macd_diff
 
-        # 이동평균선
-        df["ma5"] = ta.trend.SMAIndicator(close=df["close"], window=5).sma_indicator()  # type: ignore[attr-defined]
-        df["ma20"] = ta.trend.SMAIndicator(close=df["close"], window=20).sma_indicator()  # type: ignore[attr-defined]
-        df["ma60"] = ta.trend.SMAIndicator(close=df["close"], window=60).sma_indicator()  # type: ignore[attr-defined]
-        df["ma120"] = ta.trend.SMAIndicator(close=df["close"], window=120).sma_indicator()  # type: ignore[attr-defined]
+        # 이동평균선 (데이터가 윈도우보다 짧으면 전부 NaN이므로 계산하지 않음)
+        for window in self.MA_WINDOWS:
+            if len(df) >= window:
+                df[f"ma{window}"] = talib.SMA(close, timeperiod=window)
 
         # ATR
-        df["atr"] = ta.volatility.AverageTrueRange(  # type: ignore[attr-defined]
-            high=df["high"], low=df["low"], close=df["close"]
-        ).average_true_range()
+        df["atr"] = talib.ATR(high, low, close, timeperiod=14)
 
+        if output_rows is not None:
+            return df.iloc[-output_rows:]
         return df
 
     def get_current_status(self):
         """현재 투자 상태 조회"""
         try:
-            krw_bal = self.upbit.get_balance("KRW")
-            crypto_bal = self.upbit.get_balance(self.ticker)
-            avg_price = self.upbit.get_avg_buy_price(self.ticker)
-            price = pyupbit.get_current_price(self.ticker)
-
-            krw_balance = float(cast(float | str, krw_bal)) if krw_bal is not None else 0.0
-            crypto_balance = float(cast(float | str, crypto_bal)) if crypto_bal is not None else 0.0
-            avg_buy_price = float(cast(float | str, avg_price)) if avg_price is not None else 0.0
-            current_price = float(cast(float | str, price)) if price is not None else 0.0
+            # 잔고 3종은 계좌 조회 한 번으로, 현재가는 캐시된 값으로 가져옴
+            balances = self.trade_manager.get_account_balances()
+            self._balances = balances
+            krw_balance = balances.krw
+            crypto_balance = balances.crypto
+            avg_buy_price = balances.avg_buy_price
+            current_price = self._price() or 0.0
 
             print("\n=== Current Investment Status ===")
             print(f"보유 현금: {krw_balance:,.0f} KRW")
@@ -521,25 +1029,25 @@ class EnhancedCryptoTrader:
     def get_orderbook_data(self):
         """호가 데이터 조회"""
         try:
-            orderbook_raw = pyupbit.get_orderbook(ticker=self.ticker)
-            if not orderbook_raw or len(orderbook_raw) == 0:
-                return None
-
-            # 타입 체커를 위해 딕셔너리로 명시적 캐스팅
-            orderbook = cast(dict[str, Any], orderbook_raw)
-
-            ask_prices = []
-            ask_sizes = []
-            bid_prices = []
-            bid_sizes = []
+            # 현재가와 같은 요청 묶음에서 받은 호가 사용
+            orderbook = cast(dict[str, Any], self._fetch_market_bundle()["orderbook"])
+
+            # 상위 5호가를 (매도호가, 매도잔량, 매수호가, 매수잔량) 열을 갖는 배열로 구성
+            orderbook_units = cast(list[dict[str, Any]], orderbook.get("orderbook_units", []))[:5]
+            levels = np.array(
+                [
+                    (unit["ask_price"], unit["ask_size"], unit["bid_price"], unit["bid_size"])
+                    for unit in orderbook_units
+                ],
+                dtype=np.float64,
+            ).reshape(-1, 4)
+            ask_prices, ask_sizes, bid_prices, bid_sizes = levels.T
 
-            orderbook_units = orderbook.get("orderbook_units", [])
-            for unit in orderbook_units[:5]:
-                unit_dict = cast(dict[str, Any], unit)
-                ask_prices.append(unit_dict["ask_price"])
-                ask_sizes.append(unit_dict["ask_size"])
-                bid_prices.append(unit_dict["bid_price"])
-                bid_sizes.append(unit_dict["bid_size"])
+            # 파생 지표는 벡터 연산으로 미리 계산해 AI에 전달
+            top_ask_size = ask_sizes.sum()
+            spread = float(ask_prices[0] - bid_prices[0]) if len(levels) else 0.0
+            mid_price = float((ask_prices[0] + bid_prices[0]) / 2) if len(levels) else 0.0
+            imbalance = float(bid_sizes.sum() / top_ask_size) if top_ask_size else 0.0
 
             return {
                 "timestamp": datetime.fromtimestamp(orderbook["timestamp"] / 1000).strftime(
@@ -547,10 +1055,13 @@ class EnhancedCryptoTrader:
                 ),
                 "total_ask_size": float(orderbook["total_ask_size"]),
                 "total_bid_size": float(orderbook["total_bid_size"]),
-                "ask_prices": ask_prices,
-                "ask_sizes": ask_sizes,
-                "bid_prices": bid_prices,
-                "bid_sizes": bid_sizes,
+                "spread": spread,
+                "mid_price": mid_price,
+                "imbalance": imbalance,  # 상위 5호가 매수잔량 / 매도잔량
+                "ask_prices": ask_prices.tolist(),
+                "ask_sizes": ask_sizes.tolist(),
+                "bid_prices": bid_prices.tolist(),
+                "bid_sizes": bid_sizes.tolist(),
             }
         except Exception as e:
             print(f"Error in get_orderbook_data: {e}")
@@ -559,23 +1070,25 @@ class EnhancedCryptoTrader:
     def get_ohlcv_data(self):
         """차트 데이터 수집 및 기술적 분석"""
         try:
-            daily_data = pyupbit.get_ohlcv(self.ticker, interval="day", count=30)
-            daily_data = self.add_technical_indicators(daily_data)
-
-            hourly_data = pyupbit.get_ohlcv(self.ticker, interval="minute60", count=24)
-            hourly_data = self.add_technical_indicators(hourly_data)
+            # 가장 긴 이동평균선을 계산할 수 있을 만큼 가져온 뒤, 반환할 행만 남김
+            history = max(self.MA_WINDOWS)
+            daily_data = pyupbit.get_ohlcv(
+                self.ticker, interval="day", count=history + self.DAILY_OUTPUT_ROWS
+            )
+            daily_data = self.add_technical_indicators(daily_data, self.DAILY_OUTPUT_ROWS)
 
-            daily_data_dict = []
-            for index, row in daily_data.iterrows():
-                day_data = row.to_dict()
-                day_data["date"] = index.strftime("%Y-%m-%d")
-                daily_data_dict.append(day_data)
+            hourly_data = pyupbit.get_ohlcv(
+                self.ticker, interval="minute60", count=history + self.HOURLY_OUTPUT_ROWS
+            )
+            hourly_data = self.add_technical_indicators(hourly_data, self.HOURLY_OUTPUT_ROWS)
 
-            hourly_data_dict = []
-            for index, row in hourly_data.iterrows():
-                hour_data = row.to_dict()
-                hour_data["date"] = index.strftime("%Y-%m-%d %H:%M:%S")
-                hourly_data_dict.append(hour_data)
+            # 행 단위 iterrows 대신 벡터 연산으로 변환 (날짜 포맷도 DatetimeIndex에서 일괄 처리)
+            daily_data_dict = daily_data.assign(date=daily_data.index.strftime("%Y-%m-%d")).to_dict(
+                orient="records"
+            )
+            hourly_data_dict = hourly_data.assign(
+                date=hourly_data.index.strftime("%Y-%m-%d %H:%M:%S")
+            ).to_dict(orient="records")
 
             print("\n=== Latest Technical Indicators ===")
             print(f"RSI: {daily_data['rsi'].iloc[-1]:.2f}")
@@ -583,8 +1096,8 @@ class EnhancedCryptoTrader:
             print(f"BB Position: {daily_data['bb_pband'].iloc[-1]:.2f}")
 
             return {
-                "daily_data": daily_data_dict[-7:],
-                "hourly_data": hourly_data_dict[-6:],
+                "daily_data": daily_data_dict,
+                "hourly_data": hourly_data_dict,
                 "latest_indicators": {
                     "rsi": daily_data["rsi"].iloc[-1],
                     "macd": daily_data["macd"].iloc[-1],
@@ -596,25 +1109,26 @@ class EnhancedCryptoTrader:
             print(f"Error in get_ohlcv_data: {e}")
             return None
 
-    def capture_and_analyze_chart(self):
-        """차트 캡처 및 분석"""
-        screenshot_path = None
-        try:
-            current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-            screenshot_path = f"chart_{current_time}.png"
+    def capture_chart_image(self):
+        """차트 캡처 후 base64 인코딩된 JPEG 문자열 반환"""
+        url = f"https://upbit.com/exchange?code=CRIX.UPBIT.{self.ticker}"
+        image_bytes = self.capture_full_page(url)
 
-            url = f"https://upbit.com/exchange?code=CRIX.UPBIT.{self.ticker}"
-            capture_success = capture_full_page(url, screenshot_path)
+        if not image_bytes:
+            return None
 
-            if not capture_success:
-                return None
+        # 메모리의 이미지를 바로 base64로 인코딩 (임시 파일 사용 안 함)
+        return base64.b64encode(image_bytes).decode("utf-8")
 
-            # 이미지를 base64로 인코딩
-            with open(screenshot_path, "rb") as image_file:
-                base64_image = base64.b64encode(image_file.read()).decode("utf-8")
+    async def capture_and_analyze_chart(self):
+        """차트 캡처 및 분석"""
+        try:
+            base64_image = await asyncio.to_thread(self.capture_chart_image)
+            if not base64_image:
+                return None
 
             # OpenAI Vision API 호출
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -626,7 +1140,7 @@ class EnhancedCryptoTrader:
                             },
                             {
                                 "type": "image_url",
-                                "image_url": {"url": f"data:image/png;base64,{base64_image}"},
+                                "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
                             },
                         ],
                     }
@@ -635,21 +1149,13 @@ class EnhancedCryptoTrader:
             )
 
             # 분석 결과 처리
-            analysis_result = response.choices[0].message.content
-
-            # 임시 파일 삭제
-            if screenshot_path and os.path.exists(screenshot_path):
-                os.remove(screenshot_path)
-
-            return analysis_result
+            return response.choices[0].message.content
 
         except Exception as e:
             print(f"Error in capture_and_analyze_chart: {e}")
-            if screenshot_path and os.path.exists(screenshot_path):
-                os.remove(screenshot_path)
             return None
 
-    def get_crypto_news(self):
+    async def get_crypto_news(self):
         """비트코인 관련 최신 뉴스 조회"""
         try:
             base_url = "https://serpapi.com/search.json"
@@ -661,10 +1167,8 @@ class EnhancedCryptoTrader:
                 "hl": "en",
             }
 
-            response = requests.get(base_url, params=params)
-            if response.status_code == 200:
-                news_data = response.json()
-
+            news_data = await self._get_json(base_url, params=params)
+            if news_data is not None:
                 if "news_results" not in news_data:
                     return None
 
@@ -697,11 +1201,12 @@ class EnhancedCryptoTrader:
     # get_fear_greed_index, add_technical_indicators, get_current_status,
     # get_orderbook_data, get_ohlcv_data 메서드들은 변경 없이 유지
 
-    def get_youtube_analysis(self):
+    async def get_youtube_analysis(self):
         """유튜브 영상 자막 분석"""
         try:
-            with open("strategy.txt", encoding="utf-8") as f:
-                content = f.read()
+            content = self._strategy_text
+            if not content:
+                return None
             # all_transcripts = []
 
             # for video_id in self.youtube_channels:
@@ -768,7 +1273,7 @@ class EnhancedCryptoTrader:
 
     Provide analysis in JSON format with confidence scores."""
 
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": system_message},
@@ -784,9 +1289,9 @@ class EnhancedCryptoTrader:
                 content = response.choices[0].message.content
                 if content is None:
                     return None
-                analysis_result = json.loads(content)
+                analysis_result = orjson.loads(content)
                 return analysis_result
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 print(f"JSON Parsing Error: {e}")
                 print("Original response:", response.choices[0].message.content)
                 return None
@@ -795,40 +1300,155 @@ class EnhancedCryptoTrader:
             print(f"Error in get_youtube_analysis: {e}")
             return None
 
-    def get_ai_analysis(self, analysis_data):
-        """AI 분석 및 매매 신호 생성 (Structured Outputs 적용)"""
+    def _compact_snapshot(self, analysis_data):
+        """프롬프트 토큰을 줄이기 위해 시장 데이터를 압축
+
+        OHLCV는 행 목록 대신 열 배열로, 뉴스는 제목/날짜만, 실수는 소수점 2자리로 줄인다.
+        """
+        ohlcv = analysis_data["ohlcv"]
+        compact = {
+            "current_status": analysis_data["current_status"],
+            "orderbook": analysis_data["orderbook"],
+            "ohlcv": {
+                "daily_data": self._encode_ohlcv_deltas(self._to_columns(ohlcv["daily_data"])),
+                "hourly_data": self._encode_ohlcv_deltas(self._to_columns(ohlcv["hourly_data"])),
+                "latest_indicators": ohlcv["latest_indicators"],
+            },
+            "fear_greed": analysis_data["fear_greed"],
+        }
+        compact = _round_floats(compact)
+        compact["news"] = [
+            {"title": news["title"], "date": news["date"]} for news in analysis_data["news"]
+        ]
+        return compact
+
+    @staticmethod
+    def _to_columns(rows):
+        """행(dict) 목록을 열 이름 -> 값 배열 형태로 변환"""
+        if not rows:
+            return {}
+        return {key: [row[key] for row in rows] for key in rows[0]}
+
+    def _encode_ohlcv_deltas(self, columns):
+        """원화 가격 열을 "첫 값,+차이,-차이,..." 문자열로 델타 인코딩 (토큰 수 절감)"""
+        encoded = dict(columns)
+        for key, values in columns.items():
+            if key not in self.DELTA_COLUMNS:
+                continue
+            prices = np.rint(np.asarray(values, dtype=np.float64))
+            # NaN이 섞인 열(지표 계산 구간 부족)은 그대로 둠
+            if len(prices) == 0 or not np.isfinite(prices).all():
+                continue
+            prices = prices.astype(np.int64)
+            deltas = np.diff(prices)
+            encoded[key] = ",".join([str(prices[0]), *(f"{delta:+d}" for delta in deltas)])
+        return encoded
+
+    def _snapshot_key(self, analysis_data):
+        """의미 있는 변화가 없으면 같은 값이 나오도록 양자화한 시장 스냅샷 지문"""
+        status = analysis_data["current_status"]
+        fingerprint = (
+            self.ticker,
+            round(status["current_price"], -5),  # 10만원 단위
+            round(status["krw_balance"], -4),
+            round(status["crypto_balance"], 4),
+            analysis_data["fear_greed"]["current"]["value"] // 5,
+            round(analysis_data["orderbook"]["imbalance"], 1),
+            tuple(news["title"] for news in analysis_data["news"]),
+        )
+        return hashlib.blake2b(repr(fingerprint).encode(), digest_size=16).hexdigest()
+
+    def _classify_regime(self, analysis_data):
+        """최근 시간봉 변동성과 공포탐욕지수로 장세 복잡도 판단 (simple|complex)"""
         try:
-            # 차트 이미지 분석 수행
-            chart_analysis = self.capture_and_analyze_chart()
-            # 유튜브 분석 수행
-            youtube_analysis = self.get_youtube_analysis()
+            closes = np.array(
+                [row["close"] for row in analysis_data["ohlcv"]["hourly_data"]], dtype=np.float64
+            )
+            if len(closes) < 2:
+                return "complex"
+            volatility = float(np.std(np.diff(np.log(closes))))
+            fear_greed = analysis_data["fear_greed"]["current"]["value"]
+            low, high = self.NEUTRAL_FEAR_GREED
+
+            if volatility < self.SIMPLE_VOLATILITY_MAX and low <= fear_greed <= high:
+                return "simple"
+            return "complex"
+        except Exception as e:
+            print(f"Error in _classify_regime: {e}")
+            return "complex"
 
-            # 과거 반성 일기 분석 추가
-            past_reflections = self.db.get_reflection_history(5)
+    async def get_ai_analysis(self, analysis_data, on_decision=None):
+        """AI 분석 및 매매 신호 생성 (Structured Outputs + 스트리밍 적용)
+
+        on_decision이 주어지면 decision/percentage/confidence_score가 도착하는 즉시
+        on_decision(decision, percentage, confidence_score)를 호출함
+        """
+        try:
+            # 직전 사이클과 시장 상황이 사실상 같으면 캐시된 응답 재사용
+            # (관망 결정만 재사용: 캐시된 매수/매도로 같은 주문이 다시 나가지 않도록)
+            cache_key = self._snapshot_key(analysis_data)
+            cached = await asyncio.to_thread(self.db.get_ai_cache, cache_key)
+            if cached is not None and cached.get("decision") == "hold":
+                print("\n=== AI Analysis Cache Hit ===")
+                return cached
 
             # 분석 데이터 최적화
-            optimized_data = {
-                "current_status": analysis_data["current_status"],
-                "orderbook": analysis_data["orderbook"],
-                "ohlcv": analysis_data["ohlcv"],
-                "fear_greed": analysis_data["fear_greed"],
-                "news": analysis_data["news"],
-                "chart_analysis": chart_analysis,
-                "youtube_analysis": youtube_analysis,
-                "past_reflections": past_reflections,  # 반성 일기 데이터 추가
-            }
+            optimized_data = self._compact_snapshot(analysis_data)
+            system_message = "You are a cryptocurrency trading analyst. Analyze the provided market data and generate a trading decision. OHLCV series are given as column arrays aligned by index (oldest first). Price columns given as strings are delta-encoded: the first number is the actual KRW value and each following signed number is the change from the previous row."
+            chart_image = None
+
+            if self.fused_analysis:
+                # 차트 이미지와 전략 자료를 별도 분석 없이 매매 결정 요청에 함께 전달
+                chart_image, past_reflections = await asyncio.gather(
+                    asyncio.to_thread(self.capture_chart_image),
+                    asyncio.to_thread(self.db.get_reflection_history, 5),
+                )
 
-            response = self.client.chat.completions.create(
-                model="gpt-4o-2024-08-06",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a cryptocurrency trading analyst. Analyze the provided market data and generate a trading decision.",
-                    },
+                optimized_data["strategy_transcript"] = self._strategy_text
+                system_message += """
+The request may also include:
+- A screenshot of the current price chart: assess the current trend, key support/resistance levels, technical indicator signals and notable patterns.
+- strategy_transcript: Korean YouTube transcripts about crypto trading: extract the trading strategy (entry/exit points, risk management), market outlook and risk factors.
+Combine these with the market data and past reflections into a single trading decision."""
+            else:
+                # 차트 이미지 분석, 유튜브 분석, 과거 반성 일기 조회를 동시에 수행
+                (
+                    optimized_data["chart_analysis"],
+                    optimized_data["youtube_analysis"],
+                    past_reflections,
+                ) = await asyncio.gather(
+                    self.capture_and_analyze_chart(),
+                    self.get_youtube_analysis(),
+                    asyncio.to_thread(self.db.get_reflection_history, 5),
+                )
+
+            # 반성 일기 데이터 추가
+            optimized_data["past_reflections"] = [dict(row) for row in past_reflections]
+
+            user_content: list[dict[str, Any]] = [
+                {
+                    "type": "text",
+                    "text": f"Market Data Analysis:\n{_dumps(optimized_data)}",
+                }
+            ]
+            if chart_image:
+                user_content.append(
                     {
-                        "role": "user",
-                        "content": f"Market Data Analysis:\n{json.dumps(optimized_data, indent=2)}",
-                    },
+                        "type": "image_url",
+                        "image_url": {"url": f"data:image/jpeg;base64,{chart_image}"},
+                    }
+                )
+
+            regime = self._classify_regime(analysis_data)
+            model = self.SIMPLE_DECISION_MODEL if regime == "simple" else self.DECISION_MODEL
+            print(f"\n=== Market Regime: {regime} ({model}) ===")
+
+            stream = await self.client.chat.completions.create(
+                model=model,
+                stream=True,
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": user_content},  # type: ignore[misc]
                 ],
                 response_format={
                     "type": "json_schema",
@@ -836,62 +1456,74 @@ class EnhancedCryptoTrader:
                         "name": "trading_decision",
                         "description": "Trading decision based on market analysis",
                         "strict": True,
-                        "schema": {
-                            "type": "object",
-                            "properties": {
-                                "percentage": {
-                                    "type": "integer",
-                                    "description": "For buy: Percentage of available KRW to use for purchase. For sell: Percentage of held BTC to sell. For hold: Should be 0. Range: 0-100",
-                                },
-                                "confidence_score": {
-                                    "type": "integer",
-                                    "description": "Confidence level of the trading decision (0-100)",
-                                },
-                                "decision": {
-                                    "type": "string",
-                                    "description": "Trading decision to make",
-                                    "enum": ["buy", "sell", "hold"],
-                                },
-                                "reason": {
-                                    "type": "string",
-                                    "description": "Detailed explanation for the decision",
-                                },
-                                "reflection_based_adjustments": {
-                                    "type": "object",
-                                    "properties": {
-                                        "risk_adjustment": {"type": "string"},
-                                        "strategy_improvement": {"type": "string"},
-                                        "confidence_factors": {
-                                            "type": "array",
-                                            "items": {"type": "string"},
-                                        },
-                                    },
-                                    "required": [
-                                        "risk_adjustment",
-                                        "strategy_improvement",
-                                        "confidence_factors",
-                                    ],
-                                    "additionalProperties": False,
-                                },
-                            },
-                            "required": [
-                                "percentage",
-                                "confidence_score",
-                                "decision",
-                                "reason",
-                                "reflection_based_adjustments",
-                            ],
-                            "additionalProperties": False,
-                        },
+                        "schema": TRADING_DECISION_SCHEMA,
                     },
                 },
             )
 
+            # 응답을 스트리밍으로 받으면서 매매 결정 필드가 완성되면 바로 콜백 실행
+            content = ""
+            decision_task = None
+            early_checked = False
+            try:
+                async for chunk in stream:
+                    if not chunk.choices or not chunk.choices[0].delta.content:
+                        continue
+                    content += chunk.choices[0].delta.content
+
+                    if on_decision is not None and not early_checked:
+                        match = self.EARLY_DECISION_RE.search(content)
+                        if match:
+                            early_checked = True
+                            fields = {
+                                "percentage": int(match.group(1)),
+                                "confidence_score": int(match.group(2)),
+                                "decision": match.group(3),
+                            }
+                            try:
+                                # 실제 주문 전에 필드 범위 검증
+                                self._validate_early_decision(fields)
+                            except fastjsonschema.JsonSchemaException as e:
+                                print(f"조기 매매 결정 검증 실패, 주문하지 않습니다: {e}")
+                                continue
+                            print(
+                                f"\n=== Early Decision: {fields['decision']} ({fields['percentage']}%) ==="
+                            )
+                            decision_task = asyncio.create_task(
+                                on_decision(
+                                    fields["decision"],
+                                    fields["percentage"],
+                                    fields["confidence_score"],
+                                )
+                            )
+            finally:
+                # 스트림이 중간에 실패해도 이미 나간 주문이 끝난 뒤에 반환
+                # (그래야 호출 측이 주문 체결 후 잔고로 거래를 기록함)
+                if decision_task is not None:
+                    await decision_task
+
             # 응답 파싱
-            content = response.choices[0].message.content
-            if content is None:
+            if not content:
                 return None
-            result = json.loads(content)
+            result = orjson.loads(content)
+            try:
+                self._validate_decision(result)
+            except fastjsonschema.JsonSchemaException as e:
+                # 스키마에 맞지 않는 응답으로는 매매하지 않음
+                print(f"AI 응답 검증 실패, 관망으로 처리합니다: {e}")
+                return {
+                    "percentage": 0,
+                    "confidence_score": 0,
+                    "decision": "hold",
+                    "reason": f"AI 응답 검증 실패: {e}",
+                    "reflection_based_adjustments": {
+                        "risk_adjustment": "",
+                        "strategy_improvement": "",
+                        "confidence_factors": [],
+                    },
+                }
+            if result["decision"] == "hold":
+                await asyncio.to_thread(self.db.set_ai_cache, cache_key, result, self.AI_CACHE_TTL)
 
             return result
 
@@ -899,40 +1531,44 @@ class EnhancedCryptoTrader:
             print(f"Error in get_ai_analysis: {e}")
             return None
 
-    def execute_trade(self, decision, percentage, confidence_score, fear_greed_value, reason):
-        """매매 실행 로직"""
+    def place_order(self, decision, percentage, confidence_score, fear_greed_value):
+        """매매 주문 실행"""
         try:
             trade_ratio = self.trade_manager.adjust_trade_ratio(
                 percentage, fear_greed_value, decision
             )
 
-            if confidence_score > 70:
-                if decision == "buy":
-                    krw_bal = self.upbit.get_balance("KRW")
-                    if krw_bal is not None:
-                        krw = float(cast(float | str, krw_bal))
-                        if krw > 5000:
-                            order_amount = krw * trade_ratio
-                            order = self.trade_manager.execute_market_buy(order_amount)
-
-                            if order:
-                                print("\n=== Buy Order Executed ===")
-                                print(
-                                    f"Trade Amount: {order_amount:,.0f} KRW ({trade_ratio * 100:.1f}%)"
-                                )
+            if confidence_score > 70 and decision in ("buy", "sell"):
+                # 사이클 시작 시 조회한 잔고 재사용 (없으면 계좌 조회 한 번)
+                balances = self._balances or self.trade_manager.get_account_balances()
 
-                elif decision == "sell":
-                    btc_bal = self.upbit.get_balance(self.ticker)
-                    if btc_bal is not None:
-                        btc = float(cast(float | str, btc_bal))
-                        sell_amount = btc * trade_ratio
-                        order = self.trade_manager.execute_market_sell(sell_amount)
+                if decision == "buy":
+                    if balances.krw > 5000:
+                        order_amount = balances.krw * trade_ratio
+                        order = self.trade_manager.execute_market_buy(order_amount)
 
                         if order:
-                            print("\n=== Sell Order Executed ===")
-                            print(f"Trade Amount: {sell_amount:.8f} BTC ({trade_ratio * 100:.1f}%)")
+                            self._balances = None
+                            print("\n=== Buy Order Executed ===")
+                            print(
+                                f"Trade Amount: {order_amount:,.0f} KRW ({trade_ratio * 100:.1f}%)"
+                            )
+
+                else:
+                    sell_amount = balances.crypto * trade_ratio
+                    order = self.trade_manager.execute_market_sell(sell_amount)
 
-            # 거래 상태 기록
+                    if order:
+                        self._balances = None
+                        print("\n=== Sell Order Executed ===")
+                        print(f"Trade Amount: {sell_amount:.8f} BTC ({trade_ratio * 100:.1f}%)")
+
+        except Exception as e:
+            print(f"Error in place_order: {e}")
+
+    def record_trade_state(self, decision, percentage, reason):
+        """주문 후 잔고 상태와 함께 거래 기록"""
+        try:
             balances = self.trade_manager.get_current_balances()
             trade_data = {
                 "decision": decision,
@@ -943,26 +1579,52 @@ class EnhancedCryptoTrader:
             self.db.record_trade(trade_data)
 
         except Exception as e:
-            print(f"Error in execute_trade: {e}")
+            print(f"Error in record_trade_state: {e}")
 
 
-def ai_trading():
+async def ai_trading(trader):
     try:
-        trader = EnhancedCryptoTrader("KRW-BTC")
+        # 시장 데이터 피드를 동시에 수집
+        # (return_exceptions=True: 한 피드가 실패해도 나머지 결과는 받음)
+        results = await asyncio.gather(
+            asyncio.to_thread(trader.get_current_status),
+            asyncio.to_thread(trader.get_orderbook_data),
+            asyncio.to_thread(trader.get_ohlcv_data),
+            trader.get_fear_greed_index(),
+            trader.get_crypto_news(),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                print(f"Error while collecting market data: {result}")
+        (
+            current_status,
+            orderbook_data,
+            ohlcv_data,
+            fear_greed_data,
+            news_data,
+        ) = [None if isinstance(result, BaseException) else result for result in results]
+
+        # 반성은 방금 수집한 시장 데이터를 그대로 사용 (같은 피드를 다시 조회하지 않음)
+        # 매매 결정 요청이 새 반성 일기를 참고하도록 그 전에 완료
+        reflection = await trader.analyze_past_decisions(
+            {
+                "price": (current_status or {}).get("current_price", 0.0),
+                "status": current_status,
+                "fear_greed": fear_greed_data,
+                "technical": ohlcv_data,
+            }
+        )
 
-        # 과거 거래 분석 및 반성 수행
-        reflection = trader.analyze_past_decisions()
         if reflection:
             print("\n=== Trading Reflection ===")
-            print(json.dumps(reflection, indent=2))
+            print(_dumps(reflection, indent=True))
 
-        current_status = trader.get_current_status()
-        orderbook_data = trader.get_orderbook_data()
-        ohlcv_data = trader.get_ohlcv_data()
-        fear_greed_data = trader.get_fear_greed_index()
-        news_data = trader.get_crypto_news()
-
-        if all([current_status, orderbook_data, ohlcv_data, fear_greed_data, news_data]):
+        if (
+            all([current_status, orderbook_data, ohlcv_data, news_data])
+            and fear_greed_data
+            and "current" in fear_greed_data
+        ):
             analysis_data = {
                 "current_status": current_status,
                 "orderbook": orderbook_data,
@@ -971,72 +1633,118 @@ def ai_trading():
                 "news": news_data,
             }
 
-            ai_result = trader.get_ai_analysis(analysis_data)
+            fear_greed_value = fear_greed_data["current"]["value"]
+            early_order: tuple[str, int] | None = None
+
+            # 응답 스트림에서 매매 결정이 도착하면 나머지(reason 등)를 기다리지 않고 주문
+            async def on_decision(decision, percentage, confidence_score):
+                nonlocal early_order
+                early_order = (decision, percentage)
+                await asyncio.to_thread(
+                    trader.place_order, decision, percentage, confidence_score, fear_greed_value
+                )
+
+            ai_result = await trader.get_ai_analysis(analysis_data, on_decision=on_decision)
 
             if ai_result:
                 print("\n=== AI Analysis Result ===")
-                print(json.dumps(ai_result, indent=2))
+                print(_dumps(ai_result, indent=True))
 
                 # 반성 기반 조정사항 출력
                 print("\n=== Reflection-based Adjustments ===")
-                print(json.dumps(ai_result["reflection_based_adjustments"], indent=2))
-
-                if fear_greed_data and "current" in fear_greed_data:
-                    trader.execute_trade(
-                        ai_result["decision"],
-                        ai_result["percentage"],
-                        ai_result["confidence_score"],
-                        fear_greed_data["current"]["value"],
-                        ai_result["reason"],
-                    )
+                print(_dumps(ai_result["reflection_based_adjustments"], indent=True))
+
+            if early_order is not None:
+                # 이미 나간 주문 기준으로 기록 (최종 응답이 검증/파싱에 실패해 관망으로
+                # 대체되었더라도 실제 실행된 결정을 남김)
+                reason = ai_result["reason"] if ai_result else "AI 응답 파싱 실패"
+                await asyncio.to_thread(trader.record_trade_state, *early_order, reason)
+            elif ai_result:
+                await asyncio.to_thread(
+                    trader.place_order,
+                    ai_result["decision"],
+                    ai_result["percentage"],
+                    ai_result["confidence_score"],
+                    fear_greed_value,
+                )
+                await asyncio.to_thread(
+                    trader.record_trade_state,
+                    ai_result["decision"],
+                    ai_result["percentage"],
+                    ai_result["reason"],
+                )
 
     except Exception as e:
         print(f"Error in ai_trading: {e}")
 
+    finally:
+        # 사이클마다 버퍼에 남은 기록을 반영
+        await asyncio.to_thread(trader.db.flush)
 
-# 메인 실행 코드
-if __name__ == "__main__":
-    try:
-        env_type = "EC2" if is_ec2() else "로컬"
-        print(f"Enhanced Bitcoin Trading Bot 시작 ({env_type} 환경)")
-        print("종료하려면 Ctrl+C를 누르세요")
 
-        load_dotenv()
+TRADING_TIMES = ("09:00", "15:00", "21:00")  # 매일 트레이딩을 실행할 시각
 
-        # 필수 환경 변수 체크
-        required_env_vars = ["UPBIT_ACCESS_KEY", "UPBIT_SECRET_KEY"]
-        missing_vars = [var for var in required_env_vars if not os.getenv(var)]
-        if missing_vars:
-            raise ValueError(f"필수 환경 변수가 없습니다: {', '.join(missing_vars)}")
 
-        def run_trading():
-            try:
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                print(f"\n[{current_time}] 트레이딩 시작...")
-                ai_trading()
-                print(f"[{current_time}] 트레이딩 완료")
-            except Exception as e:
-                print(f"실행 중 오류 발생: {e}")
+def next_run_time(now):
+    """now 이후 가장 가까운 트레이딩 실행 시각"""
+    candidates = []
+    for day_offset in (0, 1):
+        day = now.date() + timedelta(days=day_offset)
+        for hhmm in TRADING_TIMES:
+            run_at = datetime.combine(day, datetime.strptime(hhmm, "%H:%M").time())
+            if run_at > now:
+                candidates.append(run_at)
+    return min(candidates)
+
+
+async def main():
+    env_type = "EC2" if is_ec2() else "로컬"
+    print(f"Enhanced Bitcoin Trading Bot 시작 ({env_type} 환경)")
+    print("종료하려면 Ctrl+C를 누르세요")
 
-        # 스케줄 설정
-        schedule.every().day.at("09:00").do(run_trading)
-        schedule.every().day.at("15:00").do(run_trading)
-        schedule.every().day.at("21:00").do(run_trading)
+    load_dotenv()
 
+    # 필수 환경 변수 체크
+    required_env_vars = ["UPBIT_ACCESS_KEY", "UPBIT_SECRET_KEY"]
+    missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+    if missing_vars:
+        raise ValueError(f"필수 환경 변수가 없습니다: {', '.join(missing_vars)}")
+
+    # 트레이더(WebDriver, DB 연결 포함)는 한 번만 생성해 모든 사이클에서 재사용
+    trader = EnhancedCryptoTrader("KRW-BTC")
+
+    async def run_trading():
+        try:
+            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            print(f"\n[{current_time}] 트레이딩 시작...")
+            await ai_trading(trader)
+            print(f"[{current_time}] 트레이딩 완료")
+        except Exception as e:
+            print(f"실행 중 오류 발생: {e}")
+
+    try:
         # 시작 시 즉시 한 번 실행
         print("\n첫 번째 트레이딩 시작...")
-        run_trading()
+        await run_trading()
 
+        # 주기적으로 깨어나 확인하지 않고, 다음 실행 시각까지 한 번에 대기
+        # (사이클이 끝난 뒤에 다음 시각을 계산하므로 사이클이 겹치지 않고,
+        #  sleep이 조금 일찍 깨어나도 같은 시각을 두 번 실행하지 않음)
+        run_at = datetime.now()
         while True:
-            try:
-                schedule.run_pending()
-                time.sleep(30)  # 30초마다 스케줄 체크
-            except KeyboardInterrupt:
-                print("\n사용자에 의해 봇이 종료되었습니다")
-                break
-            except Exception as e:
-                print(f"실행 중 오류 발생: {e}")
-                time.sleep(60)  # 에러 발생시 60초 대기
+            run_at = next_run_time(max(datetime.now(), run_at))
+            print(f"다음 트레이딩 예정 시각: {run_at:%Y-%m-%d %H:%M}")
+            await asyncio.sleep((run_at - datetime.now()).total_seconds())
+            await run_trading()
+    finally:
+        await trader.aclose()
+
 
+# 메인 실행 코드
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n사용자에 의해 봇이 종료되었습니다")
     except Exception as e:
         print(f"프로그램 실행 중 치명적 오류 발생: {e}")
@@ -1,40 +1,136 @@
+import os
 import sqlite3
+import tempfile
 from datetime import datetime, timedelta
 
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+import pyarrow as pa
 import streamlit as st
 
 # 페이지 설정
 st.set_page_config(page_title="트레이딩 모니터링 대시보드", page_icon="📊", layout="wide")
 
+DECISIONS = ["buy", "sell", "hold"]
+ROW_LIMIT = 500  # 대시보드에서 조회할 최대 행 수 (최신순)
+METRICS_REFRESH = 30  # 메트릭 카드 기본 갱신 간격(초)
+CHARTS_REFRESH = 300  # 차트/거래 내역 갱신 간격(초)
+SNAPSHOT_DIR = "dashboard_cache"  # 마지막으로 조회에 성공한 결과를 저장하는 parquet 스냅샷 폴더
+
 
 # 데이터베이스 연결
 @st.cache_resource
 def get_database_connection():
-    return sqlite3.connect("trading.db", check_same_thread=False)
+    conn = sqlite3.connect("trading.db", check_same_thread=False)
+    # 트레이딩 봇이 기록하는 동안에도 읽기가 막히지 않도록 WAL 모드 사용
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def fetch_dataframe(query, params=(), snapshot=None):
+    """쿼리 결과를 Arrow 기반 DataFrame으로 변환 (read_sql_query의 행 단위 타입 추론 생략)"""
+    snapshot_path = os.path.join(SNAPSHOT_DIR, f"{snapshot}.parquet") if snapshot else None
+    try:
+        cursor = conn.execute(query, params)
+    except sqlite3.Error as e:
+        # DB를 읽을 수 없으면 마지막 스냅샷으로 대체
+        if snapshot_path is None or not os.path.exists(snapshot_path):
+            raise
+        st.warning(f"데이터를 불러오지 못해 저장된 스냅샷을 표시합니다 ({snapshot}): {e}")
+        return pd.read_parquet(snapshot_path, dtype_backend="pyarrow")
+    columns = [column[0] for column in cursor.description]
+    df = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+    # 열 단위 Arrow 메모리로 보관해 캐시 직렬화와 st.dataframe 변환 비용을 줄임
+    df = pa.Table.from_pandas(df, preserve_index=False).to_pandas(types_mapper=pd.ArrowDtype)
+    if snapshot_path is not None:
+        # 임시 파일에 쓴 뒤 교체해 다른 세션이 쓰다 만 스냅샷을 읽지 않도록 함
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".parquet.tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, snapshot_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return df
 
 
 conn = get_database_connection()
 
 
+def has_column(table, column):
+    """테이블에 컬럼이 있는지 확인 (트레이딩 봇이 아직 새 스키마로 옮기지 않은 DB 대비)"""
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})"))
+
+
 # 데이터 로드 함수들
 @st.cache_data(ttl=60)  # 1분마다 데이터 갱신
 def load_recent_trades():
-    query = """
+    # 사유 본문은 reasons 테이블에 한 번만 저장됨 (마이그레이션 전 DB는 기존 reason 컬럼 사용)
+    if has_column("trading_history", "reason_id"):
+        reason_column = "COALESCE(r.text, h.reason)"
+        reason_join = "LEFT JOIN reasons r ON h.reason_id = r.id"
+    else:
+        reason_column, reason_join = "h.reason", ""
+    query = f"""
        SELECT
-           timestamp,
-           decision,
-           percentage,
-           reason,
-           btc_balance,
-           krw_balance,
-           btc_avg_buy_price,
-           btc_krw_price
+           h.timestamp,
+           h.decision,
+           h.percentage,
+           {reason_column} AS reason,
+           h.btc_balance,
+           h.krw_balance,
+           h.btc_avg_buy_price,
+           h.btc_krw_price
+       FROM trading_history h
+       {reason_join}
+       ORDER BY h.timestamp DESC
+       LIMIT ?
+   """
+    return fetch_dataframe(query, (ROW_LIMIT,), snapshot="trades")
+
+
+@st.cache_data(ttl=5)
+def load_latest_balances():
+    # 메트릭 카드는 가장 최근 거래 한 건만 필요 (timestamp 인덱스로 바로 조회)
+    query = """
+       SELECT btc_balance, krw_balance, btc_krw_price
        FROM trading_history
        ORDER BY timestamp DESC
+       LIMIT 1
    """
-    return pd.read_sql_query(query, conn)
+    return fetch_dataframe(query, snapshot="balances")
+
+
+@st.cache_data(ttl=60)
+def load_daily_rollup():
+    # 트레이딩 봇이 거래를 기록할 때마다 갱신하는 일별 집계 (거래 수가 아니라 일 수만큼의 행)
+    query = """
+       SELECT
+           date,
+           n_buy, n_sell, n_hold,
+           avg_pct_buy, avg_pct_sell, avg_pct_hold
+       FROM trading_daily_rollup
+       ORDER BY date DESC
+   """
+    if not has_column("trading_daily_rollup", "date"):
+        # 집계 테이블이 아직 없는 DB는 거래 내역에서 같은 형태로 직접 집계
+        query = """
+           SELECT
+               date(timestamp) AS date,
+               SUM(decision = 'buy') AS n_buy,
+               SUM(decision = 'sell') AS n_sell,
+               SUM(decision = 'hold') AS n_hold,
+               AVG(CASE WHEN decision = 'buy' THEN percentage END) AS avg_pct_buy,
+               AVG(CASE WHEN decision = 'sell' THEN percentage END) AS avg_pct_sell,
+               AVG(CASE WHEN decision = 'hold' THEN percentage END) AS avg_pct_hold
+           FROM trading_history
+           GROUP BY date(timestamp)
+           ORDER BY date DESC
+       """
+    return fetch_dataframe(query, snapshot="daily_rollup")
 
 
 @st.cache_data(ttl=60)
@@ -48,91 +144,127 @@ def load_reflections():
        FROM trading_reflection r
        JOIN trading_history h ON r.trading_id = h.id
        ORDER BY r.reflection_date DESC
+       LIMIT ?
    """
-    return pd.read_sql_query(query, conn)
+    return fetch_dataframe(query, (ROW_LIMIT,), snapshot="reflections")
 
 
 # 메인 대시보드
 st.title("📊 트레이딩 모니터링 대시보드")
 
 
-# 데이터 로드
-trades_df = load_recent_trades()
-reflections_df = load_reflections()
-
-
-# 상단 메트릭스
-col1, col2, col3, col4 = st.columns(4)
+# 사이드바에 필터 추가
+st.sidebar.title("📊 필터 옵션")
+date_range = st.sidebar.date_input(
+    "날짜 범위 선택", value=(datetime.now() - timedelta(days=7), datetime.now())
+)
 
 
-with col1:
-    latest_btc_price = trades_df.iloc[0]["btc_krw_price"] if not trades_df.empty else 0
-    st.metric("현재 BTC 가격", f"{latest_btc_price:,.0f} KRW")
+decision_filter = st.sidebar.multiselect("거래 유형", options=DECISIONS, default=DECISIONS)
 
 
-with col2:
-    latest_btc_balance = trades_df.iloc[0]["btc_balance"] if not trades_df.empty else 0
-    st.metric("BTC 보유량", f"{latest_btc_balance:.8f} BTC")
+# 자동 새로고침 옵션
+st.sidebar.write("---")
+auto_refresh = st.sidebar.checkbox("자동 새로고침", value=True)
+refresh_interval = None
+if auto_refresh:
+    refresh_interval = st.sidebar.slider(
+        "새로고침 간격(초)", min_value=5, max_value=300, value=METRICS_REFRESH
+    )
 
 
-with col3:
-    latest_krw_balance = trades_df.iloc[0]["krw_balance"] if not trades_df.empty else 0
-    st.metric("KRW 잔고", f"{latest_krw_balance:,.0f} KRW")
+# 상단 메트릭스 (가벼운 쿼리 하나만 자주 갱신하고, 나머지 화면은 다시 실행하지 않음)
+@st.fragment(run_every=refresh_interval)
+def show_metrics():
+    latest_df = load_latest_balances()
+    col1, col2, col3, col4 = st.columns(4)
 
+    with col1:
+        latest_btc_price = latest_df.iloc[0]["btc_krw_price"] if not latest_df.empty else 0
+        st.metric("현재 BTC 가격", f"{latest_btc_price:,.0f} KRW")
 
-with col4:
-    total_value = latest_btc_balance * latest_btc_price + latest_krw_balance
-    st.metric("총 자산가치", f"{total_value:,.0f} KRW")
+    with col2:
+        latest_btc_balance = latest_df.iloc[0]["btc_balance"] if not latest_df.empty else 0
+        st.metric("BTC 보유량", f"{latest_btc_balance:.8f} BTC")
 
+    with col3:
+        latest_krw_balance = latest_df.iloc[0]["krw_balance"] if not latest_df.empty else 0
+        st.metric("KRW 잔고", f"{latest_krw_balance:,.0f} KRW")
 
-# 차트 섹션
-st.subheader("📈 거래 히스토리")
-trades_df["timestamp"] = pd.to_datetime(trades_df["timestamp"])
+    with col4:
+        total_value = latest_btc_balance * latest_btc_price + latest_krw_balance
+        st.metric("총 자산가치", f"{total_value:,.0f} KRW")
 
 
-# BTC 가격 차트
-fig_price = px.line(trades_df, x="timestamp", y="btc_krw_price", title="BTC 가격 변동")
-fig_price.update_layout(height=400)
-st.plotly_chart(fig_price, use_container_width=True)
+show_metrics()
 
 
-# 매수/매도 결정 분석
-col1, col2 = st.columns(2)
+# 차트와 거래 내역은 무거우므로 더 긴 간격으로 갱신
+@st.fragment(run_every=CHARTS_REFRESH if auto_refresh else None)
+def show_trade_history():
+    trades_df = load_recent_trades()
+    rollup_df = load_daily_rollup()
 
+    # 차트 섹션
+    st.subheader("📈 거래 히스토리")
+    trades_df["timestamp"] = pd.to_datetime(trades_df["timestamp"])
 
-with col1:
-    decision_counts = trades_df["decision"].value_counts()
-    fig_decisions = px.pie(
-        values=decision_counts.values, names=decision_counts.index, title="매수/매도 비율"
+    # BTC 가격 차트 (거래가 많아져도 가볍게 그려지도록 SVG 대신 WebGL 사용)
+    fig_price = go.Figure(
+        data=[go.Scattergl(x=trades_df["timestamp"], y=trades_df["btc_krw_price"], mode="lines")]
     )
-    st.plotly_chart(fig_decisions)
-
+    fig_price.update_layout(title="BTC 가격 변동", height=400)
+    st.plotly_chart(fig_price, use_container_width=True)
 
-with col2:
-    avg_percentage_by_decision = trades_df.groupby("decision")["percentage"].mean()
-    fig_percentages = px.bar(
-        x=avg_percentage_by_decision.index,
-        y=avg_percentage_by_decision.values,
-        title="결정별 평균 변동률",
+    # 매수/매도 결정 분석 (전체 기간, 일별 집계에서 계산)
+    col1, col2 = st.columns(2)
+    decision_counts = pd.Series(
+        {decision: rollup_df[f"n_{decision}"].sum() for decision in DECISIONS}
     )
-    st.plotly_chart(fig_percentages)
 
-
-# 최근 거래 내역 테이블
-st.subheader("📝 최근 거래 내역")
-recent_trades = trades_df[["timestamp", "decision", "percentage", "reason", "btc_krw_price"]].head(
-    10
-)
-if not recent_trades.empty:
-    recent_trades = recent_trades.copy()
-    timestamp_series = pd.to_datetime(recent_trades["timestamp"])
-    recent_trades["timestamp"] = timestamp_series.dt.strftime("%Y-%m-%d %H:%M:%S")  # type: ignore[attr-defined]
-recent_trades.columns = ["시간", "결정", "변동률", "사유", "BTC 가격"]
-st.dataframe(recent_trades, use_container_width=True)
+    with col1:
+        fig_decisions = px.pie(
+            values=decision_counts.values, names=decision_counts.index, title="매수/매도 비율"
+        )
+        st.plotly_chart(fig_decisions)
+
+    with col2:
+        # 일별 평균을 거래 건수로 가중해 전체 평균으로 환산
+        avg_percentage_by_decision = pd.Series(
+            {
+                decision: (rollup_df[f"avg_pct_{decision}"] * rollup_df[f"n_{decision}"]).sum()
+                / decision_counts[decision]
+                for decision in DECISIONS
+                if int(decision_counts[decision])
+            },
+            dtype="float64",
+        )
+        fig_percentages = px.bar(
+            x=avg_percentage_by_decision.index,
+            y=avg_percentage_by_decision.values,
+            title="결정별 평균 변동률",
+        )
+        st.plotly_chart(fig_percentages)
+
+    # 최근 거래 내역 테이블
+    st.subheader("📝 최근 거래 내역")
+    recent_trades = trades_df[
+        ["timestamp", "decision", "percentage", "reason", "btc_krw_price"]
+    ].head(10)
+    if not recent_trades.empty:
+        recent_trades = recent_trades.copy()
+        timestamp_series = pd.to_datetime(recent_trades["timestamp"])
+        recent_trades["timestamp"] = timestamp_series.dt.strftime("%Y-%m-%d %H:%M:%S")  # type: ignore[attr-defined]
+    recent_trades.columns = ["시간", "결정", "변동률", "사유", "BTC 가격"]
+    st.dataframe(recent_trades, use_container_width=True)
+
+
+show_trade_history()
 
 
 # 반성일기 섹션
 st.subheader("📔 트레이딩 반성일기")
+reflections_df = load_reflections()
 if not reflections_df.empty:
     reflections_df["reflection_date"] = pd.to_datetime(reflections_df["reflection_date"])
     recent_reflections = reflections_df.head(5)
@@ -150,23 +282,3 @@ if not reflections_df.empty:
                 st.write("**개선점:**", reflection["improvement_points"])
                 st.write("**성공률:**", f"{reflection['success_rate']:.1f}%")
             st.write("**학습 포인트:**", reflection["learning_points"])
-
-
-# 사이드바에 필터 추가
-st.sidebar.title("📊 필터 옵션")
-date_range = st.sidebar.date_input(
-    "날짜 범위 선택", value=(datetime.now() - timedelta(days=7), datetime.now())
-)
-
-
-decision_filter = st.sidebar.multiselect(
-    "거래 유형", options=trades_df["decision"].unique(), default=trades_df["decision"].unique()
-)
-
-
-# 자동 새로고침 옵션
-st.sidebar.write("---")
-auto_refresh = st.sidebar.checkbox("자동 새로고침", value=True)
-if auto_refresh:
-    refresh_interval = st.sidebar.slider("새로고침 간격(초)", min_value=5, max_value=300, value=60)
-    st.empty()